@@ -2,7 +2,8 @@ import streamlit as st
 from crewai import Crew, Process
 from agents import researcher, tech_architect, writer, ux_researcher, financial_analyst, risk_analyst, critic
 from tasks import research_task, ux_task, tech_task, financial_task, risk_task, critic_task, prd_task
-from prd_analyzer import extract_text_from_pdf, critique_prd, rewrite_prd
+from prd_analyzer import extract_text_from_pdf, critique_prd, plan_rewrite, rewrite_prd
+from exporter import FORMATS, retry_failed, submit_export, submit_bundle
 
 st.set_page_config(page_title="Auto-PM Optimizer", layout="wide")
 
@@ -27,6 +28,82 @@ with st.sidebar:
         with st.expander(f"{role}"):
             st.caption(description)
 
+
+# Export downloads: artifacts render in a background worker and are cached by
+# content hash, so reruns and repeated downloads never re-render anything.
+# Failed renders are remembered so polling doesn't resubmit them; this clears them
+def _retry_button(key: str):
+    if st.button("Retry", key=key):
+        retry_failed()
+        st.rerun()
+
+
+def _draw_export_row(futures: dict, label: str, file_stem: str, key: str):
+    columns = st.columns(len(futures))
+    for column, (fmt, future) in zip(columns, futures.items()):
+        with column:
+            if future.done() and future.exception() is None:
+                st.download_button(
+                    label=f"{label} ({FORMATS[fmt]['label']})",
+                    data=future.result(),
+                    file_name=f"{file_stem}.{fmt}",
+                    mime=FORMATS[fmt]["mime"],
+                    key=f"{key}_{fmt}",
+                    on_click="ignore",
+                    use_container_width=True
+                )
+            elif future.done():
+                st.caption(f"{FORMATS[fmt]['label']} export failed: {future.exception()}")
+                _retry_button(f"{key}_{fmt}_retry")
+            else:
+                st.caption(f"Rendering {FORMATS[fmt]['label']}...")
+
+
+def _draw_bundle(futures: dict, name: str, key: str):
+    future = futures["zip"]
+    if future.done() and future.exception() is None:
+        st.download_button(
+            label="Download Bundle (PRD + Critique + Sources, .zip)",
+            data=future.result(),
+            file_name=f"Bundle_{name}.zip",
+            mime="application/zip",
+            key=key,
+            on_click="ignore"
+        )
+    elif future.done():
+        st.caption(f"Bundle export failed: {future.exception()}")
+        _retry_button(f"{key}_retry")
+    else:
+        st.caption("Building export bundle...")
+
+
+# Only rendered while something is still pending: once every future settles it
+# triggers one full rerun, which draws the static version and drops this fragment,
+# so nothing keeps polling afterwards.
+@st.fragment(run_every=1)
+def _await_exports(futures: dict, draw, *args):
+    if all(future.done() for future in futures.values()):
+        st.rerun()
+    draw(futures, *args)
+
+
+def _show_exports(futures: dict, draw, *args):
+    if all(future.done() for future in futures.values()):
+        draw(futures, *args)
+    else:
+        _await_exports(futures, draw, *args)
+
+
+def export_downloads(label: str, markdown_text: str, file_stem: str, key: str):
+    futures = {fmt: submit_export(markdown_text, fmt, file_stem) for fmt in FORMATS}
+    _show_exports(futures, _draw_export_row, label, file_stem, key)
+
+
+def bundle_download(name: str, prd_text: str, critique_text: str, sources: dict, key: str):
+    futures = {"zip": submit_bundle(name, prd_text, critique_text, sources)}
+    _show_exports(futures, _draw_bundle, name, key)
+
+
 # Page Tabs 
 tab_generate, tab_analyze = st.tabs(["Generate New PRD", "Analyze Existing PRD"])
 
@@ -82,20 +159,13 @@ with tab_generate:
 
                 result = auto_pm_crew.kickoff(inputs={'product_idea': user_idea})
 
+                st.session_state["generated_prd"]  = str(result)
+                st.session_state["generated_idea"] = user_idea
+
                 progress_bar.progress(100)
                 status_text.success("All 7 agents complete!")
 
                 st.success("PRD Generated Successfully!")
-                st.divider()
-                st.subheader(f"📄 PRD: {user_idea}")
-                st.markdown(str(result))
-
-                st.download_button(
-                    label="⬇️ Download PRD as Markdown",
-                    data=str(result),
-                    file_name=f"PRD_{user_idea[:40].replace(' ', '_')}.md",
-                    mime="text/markdown"
-                )
 
             except Exception as e:
                 progress_bar.empty()
@@ -103,6 +173,22 @@ with tab_generate:
                 st.error(f"An error occurred during agent execution: {e}")
                 st.exception(e)
 
+    # Render the generated PRD from session so it survives reruns
+    if st.session_state.get("generated_prd"):
+        generated_prd  = st.session_state["generated_prd"]
+        generated_idea = st.session_state["generated_idea"]
+
+        st.divider()
+        st.subheader(f"📄 PRD: {generated_idea}")
+        st.markdown(generated_prd)
+
+        export_downloads(
+            label="⬇️ Download PRD",
+            markdown_text=generated_prd,
+            file_stem=f"PRD_{generated_idea[:40].replace(' ', '_')}",
+            key="download_prd"
+        )
+
 
 # TAB 2 — ANALYZE EXISTING PRD
 
@@ -132,6 +218,7 @@ with tab_analyze:
                     st.session_state["critique_done"]   = False
                     st.session_state["critique_result"] = None
                     st.session_state["improved_prd"]    = None
+                    st.session_state["market_validation"] = None
                 except ValueError as e:
                     st.error(str(e))
                     st.stop()
@@ -157,11 +244,10 @@ with tab_analyze:
             st.subheader("Critique Report")
             st.markdown(critique_result)
 
-            st.download_button(
-                label="Download Critique as Markdown",
-                data=critique_result,
-                file_name=f"Critique_{uploaded_file.name.replace('.pdf', '')}.md",
-                mime="text/markdown",
+            export_downloads(
+                label="Download Critique",
+                markdown_text=critique_result,
+                file_stem=f"Critique_{uploaded_file.name.replace('.pdf', '')}",
                 key="download_critique"
             )
 
@@ -173,14 +259,33 @@ with tab_analyze:
                 "to produce a stronger, fully fleshed-out PRD. All flagged gaps will be addressed."
             )
 
+            # Gate: only pay for the stages the critique actually calls for
+            plan = plan_rewrite(critique_result)
+            if plan["skipped_stages"]:
+                score = plan["quality_score"]
+                score_note = f"Quality score {score:g}/10. " if score is not None else ""
+                st.info(
+                    f"{score_note}Skipping: {', '.join(plan['skipped_stages'])}. "
+                    f"Estimated time saved: ~{plan['estimated_seconds_saved']} sec."
+                )
+
+            if plan["run_validation"]:
+                spinner_text = "Researcher validating market claims... Writer rebuilding PRD... (~2 min)"
+            elif plan["rewrite_mode"] == "targeted":
+                spinner_text = "Writer applying targeted fixes... (~30 sec)"
+            else:
+                spinner_text = "Writer rebuilding PRD... (~1 min)"
+
             if st.button("Regenerate Improved PRD", use_container_width=False, key="rewrite_btn"):
-                with st.spinner("Researcher validating market claims... Writer rebuilding PRD... (~2 min)"):
+                with st.spinner(spinner_text):
                     try:
-                        improved_prd = rewrite_prd(
+                        improved_prd, market_validation = rewrite_prd(
                             prd_text=st.session_state["prd_text"],
-                            critique_text=critique_result
+                            critique_text=critique_result,
+                            plan=plan
                         )
-                        st.session_state["improved_prd"] = improved_prd
+                        st.session_state["improved_prd"]      = improved_prd
+                        st.session_state["market_validation"] = market_validation
                     except Exception as e:
                         st.error(f"Rewrite failed: {e}")
                         st.exception(e)
@@ -193,10 +298,18 @@ with tab_analyze:
                 st.subheader("Improved PRD")
                 st.markdown(improved_prd)
 
-                st.download_button(
-                    label="Download Improved PRD as Markdown",
-                    data=improved_prd,
-                    file_name=f"Improved_PRD_{uploaded_file.name.replace('.pdf', '')}.md",
-                    mime="text/markdown",
+                export_downloads(
+                    label="Download Improved PRD",
+                    markdown_text=improved_prd,
+                    file_stem=f"Improved_PRD_{uploaded_file.name.replace('.pdf', '')}",
                     key="download_improved"
+                )
+
+                market_validation = st.session_state.get("market_validation")
+                bundle_download(
+                    name=uploaded_file.name.replace('.pdf', ''),
+                    prd_text=improved_prd,
+                    critique_text=critique_result,
+                    sources={"market_validation": market_validation} if market_validation else None,
+                    key="download_bundle"
                 )
\ No newline at end of file
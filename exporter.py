@@ -0,0 +1,428 @@
+"""
+exporter.py
+
+Export pipeline for generated PRDs and critique reports:
+  render_artifact() : Renders Markdown to md / html / pdf / docx bytes, cached by content hash.
+  submit_export()   : Same, but in a background worker so the Streamlit UI never blocks.
+  export_batch()    : Queues many documents x formats at once for bulk exports.
+  build_bundle()    : Zips the PRD, critique and evidence sources into one archive
+                      (submit_bundle() does the same in the background).
+
+Rendered artifacts are kept in a small in-memory LRU and on disk (EXPORT_CACHE_DIR),
+keyed by a hash of the renderer version, format and Markdown source, so Streamlit
+reruns and repeated downloads never re-render the same document. Bump
+RENDERER_VERSION whenever a renderer or DOCUMENT_CSS changes.
+"""
+
+import hashlib
+import html
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+from docx import Document
+from markdown_it import MarkdownIt
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", ".export_cache")
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "4"))
+EXPORT_MEMORY_ITEMS = int(os.getenv("EXPORT_MEMORY_ITEMS", "64"))       # artifacts held in RAM
+EXPORT_CACHE_MAX_FILES = int(os.getenv("EXPORT_CACHE_MAX_FILES", "2000"))  # artifacts kept on disk
+
+# Part of every cache key — bump when render_* or DOCUMENT_CSS change so stale artifacts are ignored
+RENDERER_VERSION = "2"
+
+FORMATS = {
+    "md":   {"label": "Markdown", "mime": "text/markdown"},
+    "html": {"label": "HTML",     "mime": "text/html"},
+    "pdf":  {"label": "PDF",      "mime": "application/pdf"},
+    "docx": {"label": "Word",     "mime": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"},
+}
+
+DOCUMENT_CSS = """
+body { font-family: sans-serif; font-size: 11pt; line-height: 1.4; color: #222; }
+h1 { font-size: 20pt; } h2 { font-size: 16pt; } h3 { font-size: 13pt; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #999; padding: 4px 6px; text-align: left; vertical-align: top; }
+code, pre { font-family: monospace; font-size: 9.5pt; background: #f4f4f4; }
+"""
+
+# Raw HTML is disabled: LLM output and uploaded PDFs must not inject markup into exports
+_markdown = MarkdownIt("commonmark", {"html": False}).enable("table").enable("strikethrough")
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+_memory_cache = OrderedDict()
+_in_flight = {}
+_failed = {}
+_lock = threading.Lock()
+
+
+# RENDERERS
+
+def render_html(markdown_text: str, title: str = "Document") -> str:
+    """
+    Render Markdown to a standalone HTML page with embedded styles.
+    """
+    body = _markdown.render(markdown_text)
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title><style>{DOCUMENT_CSS}</style></head>\n"
+        f"<body>\n{body}</body></html>\n"
+    )
+
+
+def render_pdf(markdown_text: str) -> bytes:
+    """
+    Render Markdown to a Letter-size PDF using PyMuPDF's HTML Story layout.
+    """
+    # MuPDF's fallback fonts cover ✅ ⚠ ❌, but draw the emoji variation selector as a blank box
+    markdown_text = markdown_text.replace("\ufe0f", "")
+
+    buffer = io.BytesIO()
+    story = fitz.Story(html=_markdown.render(markdown_text), user_css=DOCUMENT_CSS)
+    writer = fitz.DocumentWriter(buffer)
+    mediabox = fitz.paper_rect("letter")
+    content_area = mediabox + (54, 54, -54, -54)  # 0.75in margins
+
+    more = True
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(content_area)
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+
+    return buffer.getvalue()
+
+
+def _add_inline(paragraph, inline_token):
+    """
+    Append the children of a markdown-it inline token to a python-docx paragraph,
+    carrying bold / italic / code formatting over as runs.
+    """
+    bold = italic = False
+    for child in inline_token.children or []:
+        if child.type == "strong_open":
+            bold = True
+        elif child.type == "strong_close":
+            bold = False
+        elif child.type == "em_open":
+            italic = True
+        elif child.type == "em_close":
+            italic = False
+        elif child.type in ("softbreak", "hardbreak"):
+            paragraph.add_run().add_break()
+        elif child.type in ("text", "code_inline"):
+            run = paragraph.add_run(child.content)
+            run.bold, run.italic = bold, italic
+            if child.type == "code_inline":
+                run.font.name = "Courier New"
+
+
+def render_docx(markdown_text: str) -> bytes:
+    """
+    Render Markdown to a Word document. Headings, paragraphs, bullet/numbered
+    lists, tables and code blocks are mapped to native Word styles.
+    """
+    document = Document()
+    tokens = _markdown.parse(markdown_text)
+
+    list_styles = []       # stack of "List Bullet" / "List Number" for nested lists
+    table_rows = None      # list of rows (each a list of inline tokens) while inside a table
+    style = None           # style for the next paragraph, set by the enclosing block
+
+    for token in tokens:
+        if token.type == "heading_open":
+            style = f"Heading {min(int(token.tag[1]), 9)}"
+        elif token.type == "bullet_list_open":
+            list_styles.append("List Bullet")
+        elif token.type == "ordered_list_open":
+            list_styles.append("List Number")
+        elif token.type in ("bullet_list_close", "ordered_list_close"):
+            list_styles.pop()
+        elif token.type == "table_open":
+            table_rows = []
+        elif token.type == "tr_open":
+            table_rows.append([])
+        elif token.type == "table_close":
+            columns = max(len(row) for row in table_rows) if table_rows else 0
+            if columns:
+                table = document.add_table(rows=len(table_rows), cols=columns)
+                table.style = "Table Grid"
+                for r, row in enumerate(table_rows):
+                    for c, cell_inline in enumerate(row):
+                        _add_inline(table.cell(r, c).paragraphs[0], cell_inline)
+            table_rows = None
+        elif token.type in ("fence", "code_block"):
+            run = document.add_paragraph().add_run(token.content.rstrip("\n"))
+            run.font.name = "Courier New"
+        elif token.type == "hr":
+            document.add_paragraph("—" * 20)
+        elif token.type == "inline":
+            if table_rows is not None:
+                table_rows[-1].append(token)
+                continue
+            if style is None and list_styles:
+                style = list_styles[-1] if len(list_styles) == 1 else f"{list_styles[-1]} 2"
+            _add_inline(document.add_paragraph(style=style), token)
+            style = None
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _render(markdown_text: str, fmt: str, title: str) -> bytes:
+    if fmt == "md":
+        return markdown_text.encode("utf-8")
+    if fmt == "html":
+        return render_html(markdown_text, title).encode("utf-8")
+    if fmt == "pdf":
+        return render_pdf(markdown_text)
+    if fmt == "docx":
+        return render_docx(markdown_text)
+    raise ValueError(f"Unsupported export format '{fmt}'. Choose from: {', '.join(FORMATS)}.")
+
+
+# CACHED + BACKGROUND RENDERING
+
+def content_hash(*parts: str) -> str:
+    """
+    Stable SHA-256 hex digest of the given strings (salted with RENDERER_VERSION),
+    used as the artifact cache key.
+    """
+    digest = hashlib.sha256(f"v{RENDERER_VERSION}\0".encode("utf-8"))
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _memory_get(key: str):
+    # Caller must hold _lock
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+    return None
+
+
+def _memory_put(key: str, data: bytes):
+    with _lock:
+        _memory_cache[key] = data
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > EXPORT_MEMORY_ITEMS:
+            _memory_cache.popitem(last=False)
+
+
+def _prune_disk_cache():
+    """
+    Keep at most EXPORT_CACHE_MAX_FILES artifacts on disk, dropping the least
+    recently used (cache hits refresh a file's mtime).
+    """
+    entries = [e for e in os.scandir(EXPORT_CACHE_DIR) if e.is_file() and not e.name.endswith(".tmp")]
+    if len(entries) <= EXPORT_CACHE_MAX_FILES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - EXPORT_CACHE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # another worker got there first
+
+
+def _cached(key: str, ext: str, produce) -> bytes:
+    """
+    Return the artifact stored under `key`, checking the memory LRU then disk,
+    and only calling produce() to build it on a miss. Disk writes go through a
+    temp file and an atomic rename so concurrent readers never see a partial artifact.
+    """
+    with _lock:
+        data = _memory_get(key)
+    if data is not None:
+        return data
+
+    path = os.path.join(EXPORT_CACHE_DIR, f"{key}.{ext}")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)
+    except FileNotFoundError:
+        # Not on disk, or pruned by another worker between listing and reading
+        data = produce()
+        os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        _prune_disk_cache()
+
+    _memory_put(key, data)
+    return data
+
+
+def _submit(key: str, fn, *args) -> Future:
+    """
+    Run fn(*args) in the worker pool, sharing one Future between identical
+    requests that are already cached, still in flight, or have failed.
+    Failed futures are kept so a broken render is not retried on every poll;
+    call retry_failed() to clear them.
+    """
+    with _lock:
+        data = _memory_get(key)
+        if data is not None:
+            future = Future()
+            future.set_result(data)
+            return future
+        if key in _in_flight:
+            return _in_flight[key]
+        if key in _failed:
+            return _failed[key]
+
+        future = _executor.submit(fn, *args)
+        _in_flight[key] = future
+
+    def _settle(done):
+        with _lock:
+            _in_flight.pop(key, None)
+            if done.exception() is not None:
+                _failed[key] = done
+
+    future.add_done_callback(_settle)
+    return future
+
+
+def retry_failed():
+    """
+    Forget recorded render failures so the next request for them runs again.
+    """
+    with _lock:
+        _failed.clear()
+
+
+def _artifact_key(markdown_text: str, fmt: str, title: str) -> str:
+    # Only HTML embeds the title, so other formats share one artifact per content
+    return content_hash(fmt, title if fmt == "html" else "", markdown_text)
+
+
+def render_artifact(markdown_text: str, fmt: str, title: str = "Document") -> bytes:
+    """
+    Render Markdown to the requested format ("md", "html", "pdf" or "docx").
+    Results are cached in memory and on disk by content hash, so the same
+    document is only ever rendered once per format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Choose from: {', '.join(FORMATS)}.")
+
+    key = _artifact_key(markdown_text, fmt, title)
+    return _cached(key, fmt, lambda: _render(markdown_text, fmt, title))
+
+
+def submit_export(markdown_text: str, fmt: str, title: str = "Document") -> Future:
+    """
+    Render an artifact in the background worker pool and return a Future for its bytes.
+    Identical requests already queued or cached share the same Future.
+    """
+    return _submit(_artifact_key(markdown_text, fmt, title), render_artifact, markdown_text, fmt, title)
+
+
+def export_batch(documents: dict, formats=("md", "pdf", "docx")) -> dict:
+    """
+    Queue every document in every format without waiting on any of them.
+    `documents` maps a title to its Markdown text; returns {(title, fmt): Future}.
+    """
+    return {
+        (title, fmt): submit_export(text, fmt, title)
+        for title, text in documents.items()
+        for fmt in formats
+    }
+
+
+# BUNDLES
+
+URL_PATTERN = re.compile(r"https?://[^\s)\]>\"'|]+")
+
+
+def extract_sources(*texts: str) -> list:
+    """
+    Collect the unique URLs cited across the given documents, in order of first appearance.
+    """
+    seen = {}
+    for text in texts:
+        for url in URL_PATTERN.findall(text or ""):
+            seen.setdefault(url.rstrip(".,;:"), None)
+    return list(seen)
+
+
+def _bundle_key(name: str, documents: dict, evidence: dict, formats) -> str:
+    entries = sorted({**documents, **evidence}.items())
+    return content_hash("bundle", name, ",".join(formats), *(f"{t}\0{text}" for t, text in entries))
+
+
+def _bundle_contents(name, prd_text, critique_text, sources):
+    documents = {f"PRD_{name}": prd_text}
+    if critique_text:
+        documents[f"Critique_{name}"] = critique_text
+
+    cited = extract_sources(*documents.values(), *(sources or {}).values())
+    listing = "\n".join(f"- <{url}>" for url in cited) if cited else "_No external sources were cited._"
+    evidence = {"sources": f"# Evidence Sources\n\n{listing}\n"}
+    evidence.update(sources or {})
+    return documents, evidence
+
+
+def _write_bundle(documents: dict, evidence: dict, formats) -> bytes:
+    # Members are rendered inline (not via the pool) so a bundle running in a
+    # worker never waits on other queued work in the same pool.
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for title, text in documents.items():
+            for fmt in formats:
+                archive.writestr(f"{title}.{fmt}", render_artifact(text, fmt, title))
+        for title, text in evidence.items():
+            archive.writestr(f"evidence/{title}.md", text)
+    return buffer.getvalue()
+
+
+def _bundle_job(name, prd_text, critique_text, sources, formats):
+    """
+    Work out a bundle's contents and cache key once, returning the key and a
+    zero-argument callable that returns the (cached) ZIP bytes.
+    """
+    documents, evidence = _bundle_contents(name, prd_text, critique_text, sources)
+    key = _bundle_key(name, documents, evidence, formats)
+    return key, lambda: _cached(key, "zip", lambda: _write_bundle(documents, evidence, formats))
+
+
+def build_bundle(
+    name: str,
+    prd_text: str,
+    critique_text: str = None,
+    sources: dict = None,
+    formats=("md", "pdf", "docx"),
+) -> bytes:
+    """
+    Build a ZIP archive containing the PRD and (optionally) the critique in every
+    requested format, plus evidence/sources.md listing the URLs cited in them.
+    `sources` may map extra file names to Markdown text (e.g. a market validation note).
+    The archive itself is cached by content hash like any other artifact.
+    """
+    _, produce = _bundle_job(name, prd_text, critique_text, sources, formats)
+    return produce()
+
+
+def submit_bundle(
+    name: str,
+    prd_text: str,
+    critique_text: str = None,
+    sources: dict = None,
+    formats=("md", "pdf", "docx"),
+) -> Future:
+    """
+    Background version of build_bundle(); returns a Future for the ZIP bytes.
+    """
+    key, produce = _bundle_job(name, prd_text, critique_text, sources, formats)
+    return _submit(key, produce)
@@ -3,12 +3,16 @@ prd_analyzer.py
 
 Two-stage pipeline for analyzing an uploaded PRD:
   Stage 1 — critique_prd()   : Critic agent scores and red-teams the document.
-  Stage 2 — rewrite_prd()    : Writer agent produces an improved PRD using the critique.
+  Gate    — plan_rewrite()   : Parses the critique and decides which rewrite stages are needed.
+  Stage 2 — rewrite_prd()    : Writer agent produces an improved PRD using the critique
+                               and returns the researcher's market validation note alongside it.
 
 Both functions accept the raw extracted text of the PDF so the calling code
 (app.py) only needs to handle file I/O once.
 """
 
+import re
+
 import pdfplumber
 from crewai import Crew, Process, Task
 from agents import critic, writer, researcher
@@ -92,14 +96,158 @@ def critique_prd(prd_text: str) -> str:
     return str(result)
 
 
+# GATE: DECIDE WHICH REWRITE STAGES ARE NEEDED
+
+PRD_SECTIONS = [
+    "Executive Summary", "Problem Statement", "User Personas", "Market Opportunity",
+    "Product Vision & Goals", "Feature Requirements", "Technical Architecture",
+    "Financial Model", "Risk Register", "Open Questions & Next Steps",
+]
+
+# A PRD scoring at or above this (with nothing missing) only gets a targeted rewrite
+LIGHT_TOUCH_SCORE = 8.0
+
+# Rough wall-clock cost of each rewrite stage, in seconds (used for the "time saved" estimate)
+STAGE_ESTIMATES = {
+    "validate":         60,
+    "rewrite_full":     60,
+    "rewrite_targeted": 30,
+}
+
+# Stems, so "competitors", "market sizing", "pricing benchmarks" etc. all match
+MARKET_PATTERNS = (
+    r"\bcompetit\w*", r"\bmarket\s+(?:siz|shar|leader|trend)\w*", r"\baddressable\s+market",
+    r"\bpricing\b", r"\bincumbent\w*",
+)
+# Acronyms are matched case-sensitively so persona names like "Sam" don't count
+MARKET_ACRONYMS = r"\b(?:TAM|SAM|SOM)s?\b"
+
+
+def _critique_section(critique_text: str, number: int) -> str:
+    """
+    Return the body of the numbered '### N.' section of a critique report,
+    or an empty string if the heading cannot be found.
+    """
+    match = re.search(
+        rf"^#+\s*{number}\.(.*?)(?=^#+\s*\d+\.|\Z)",
+        critique_text,
+        flags=re.MULTILINE | re.DOTALL,
+    )
+    return match.group(1) if match else ""
+
+
+def _parse_quality_score(critique_text: str):
+    """
+    Pull the 'X/10' Overall Quality Score out of the critique.
+    Returns a float, or None if no score could be found.
+    """
+    # Only trust the score section; any other 'X/10' (e.g. in scorecard notes)
+    # is not the overall score, and an unknown layout should mean a full rewrite.
+    match = re.search(r"(\d+(?:\.\d+)?)\s*/\s*10\b", _critique_section(critique_text, 5))
+    return float(match.group(1)) if match else None
+
+
+def _parse_flagged_sections(critique_text: str) -> dict:
+    """
+    Read the Section Coverage Scorecard and return {section: "weak" | "missing"}
+    for every standard PRD section not marked as present. Returns {} when there
+    is no scorecard; plan_rewrite() treats that layout as unknown.
+    """
+    scorecard = _critique_section(critique_text, 1)
+    flagged = {}
+    for line in scorecard.splitlines():
+        for section in PRD_SECTIONS:
+            if section.lower() not in line.lower() or section in flagged:
+                continue
+            if "❌" in line:
+                flagged[section] = "missing"
+            elif "⚠" in line:
+                flagged[section] = "weak"
+    return flagged
+
+
+def _has_market_issues(critique_text: str, flagged_sections: dict) -> bool:
+    """
+    True if the critique raises anything the researcher should validate with
+    web search: a weak/missing Market Opportunity section, or competitor and
+    market-size concerns among the assumptions, blind spots, contradictions or
+    recommended improvements.
+    """
+    if "Market Opportunity" in flagged_sections:
+        return True
+
+    issues = " ".join(_critique_section(critique_text, n) for n in (2, 3, 4, 6))
+    if not issues.strip():
+        # Unrecognised critique layout — be conservative and keep validation on
+        return True
+
+    if re.search(MARKET_ACRONYMS, issues):
+        return True
+    return any(re.search(pattern, issues, flags=re.IGNORECASE) for pattern in MARKET_PATTERNS)
+
+
+def plan_rewrite(critique_text: str) -> dict:
+    """
+    Parse a critique report and decide which rewrite stages are worth running.
+
+    Returns a plan dict with:
+      quality_score      : float | None — the critique's Overall Quality Score
+      flagged_sections   : {section: "weak" | "missing"} from the scorecard
+      run_validation     : whether the search-heavy market validation is needed
+      rewrite_mode       : "full" or "targeted" (minor fixes to flagged areas only)
+      skipped_stages     : human-readable names of the stages that will not run
+      estimated_seconds_saved : rough time saved versus a full rewrite pass
+    """
+    quality_score    = _parse_quality_score(critique_text)
+    flagged_sections = _parse_flagged_sections(critique_text)
+    run_validation   = _has_market_issues(critique_text, flagged_sections)
+
+    # Without a scorecard we can't tell what is missing, so never go light-touch
+    has_scorecard = bool(_critique_section(critique_text, 1).strip())
+    light_touch = (
+        has_scorecard
+        and quality_score is not None
+        and quality_score >= LIGHT_TOUCH_SCORE
+        and "missing" not in flagged_sections.values()
+    )
+    rewrite_mode = "targeted" if light_touch else "full"
+
+    skipped_stages = []
+    seconds_saved  = 0
+    if not run_validation:
+        skipped_stages.append("Market validation (web search)")
+        seconds_saved += STAGE_ESTIMATES["validate"]
+    if rewrite_mode == "targeted":
+        skipped_stages.append("Full PRD rewrite (targeted fixes only)")
+        seconds_saved += STAGE_ESTIMATES["rewrite_full"] - STAGE_ESTIMATES["rewrite_targeted"]
+
+    return {
+        "quality_score":           quality_score,
+        "flagged_sections":        flagged_sections,
+        "run_validation":          run_validation,
+        "rewrite_mode":            rewrite_mode,
+        "skipped_stages":          skipped_stages,
+        "estimated_seconds_saved": seconds_saved,
+    }
+
+
 # STAGE 2: REWRITE 
 
-def rewrite_prd(prd_text: str, critique_text: str) -> str:
+def rewrite_prd(prd_text: str, critique_text: str, plan: dict = None) -> tuple:
     """
     Run the Researcher + Writer agents to produce an improved PRD.
     The writer receives both the original PRD and the critique as context.
     The researcher validates any market or competitive claims in parallel context.
+
+    Returns (improved_prd, market_validation). market_validation is the
+    researcher's Market Validation Note, or None if validation was skipped.
+
+    If a plan from plan_rewrite() is given, the researcher is skipped when no
+    market issues were flagged, and the writer only makes targeted fixes when
+    the critique found nothing more than minor problems.
     """
+    if plan is None:
+        plan = plan_rewrite(critique_text)
 
     # Task 1: researcher validates competitive/market claims in the original PRD uses researcher agent 
     validate_task = Task(
@@ -124,35 +272,84 @@ def rewrite_prd(prd_text: str, critique_text: str) -> str:
         agent=researcher
     )
 
-    # Task 2: writer produces the improved PRD
-    rewrite_task = Task(
-        description=(
-            "You are rewriting an existing PRD to make it significantly better. "
-            "You have three inputs:\n\n"
-            "=== INPUT 1: ORIGINAL PRD ===\n"
-            f"{prd_text}\n"
-            "=== END ORIGINAL PRD ===\n\n"
-            "=== INPUT 2: CRITIQUE REPORT ===\n"
-            f"{critique_text}\n"
-            "=== END CRITIQUE ===\n\n"
+    if plan["run_validation"]:
+        market_input = (
             "=== INPUT 3: MARKET VALIDATION (from researcher above) ===\n"
             "[Use the researcher's output from the previous task]\n\n"
+        )
+        market_instruction = "- Incorporate the corrected market intelligence from the researcher.\n"
+    else:
+        market_input = ""
+        market_instruction = (
+            "- The critique raised no market or competitor concerns — keep the existing "
+            "market claims as they are.\n"
+        )
+
+    if plan["rewrite_mode"] == "targeted":
+        flagged = ", ".join(plan["flagged_sections"])
+        flagged_instruction = (
+            f"- Revise the sections flagged as ⚠️ Weak in the critique scorecard: {flagged}.\n"
+            if flagged else
+            "- No section was flagged as weak or missing — do not rewrite any section wholesale.\n"
+        )
+        preamble = (
+            "You are polishing an existing PRD that the critique already rated highly. "
+            "Only light, targeted touch-ups are needed — not a rewrite. "
+        )
+        instructions = (
+            "Your instructions:\n"
+            f"{flagged_instruction}"
+            "- Apply the Top 5 Recommended Improvements from the critique with minimal, targeted edits. "
+            "These edits may touch sections that are not flagged in the scorecard.\n"
+            f"{market_instruction}"
+            "- Update the 'Open Questions & Next Steps' section (adding it if absent) so it maps to the "
+            "  3 weakest assumptions identified in the critique, with a concrete validation action for each.\n"
+            "- Apart from the edits above, keep the original wording, structure and length of every section."
+        )
+        output_intro = (
+            "The original PRD in Markdown with the targeted edits applied, keeping all 10 standard sections:\n"
+        )
+    else:
+        preamble = "You are rewriting an existing PRD to make it significantly better. "
+        instructions = (
             "Your instructions:\n"
             "- Preserve everything that was already strong in the original PRD.\n"
             "- Fix every section flagged as ⚠️ Weak or ❌ Missing in the critique scorecard.\n"
             "- Address each of the Top 5 Recommended Improvements from the critique.\n"
-            "- Incorporate the corrected market intelligence from the researcher.\n"
+            f"{market_instruction}"
             "- Add an 'Open Questions & Next Steps' section that directly maps to the "
             "  3 weakest assumptions identified in the critique, with a concrete validation action for each.\n"
             "- Do NOT add filler text. If a section is genuinely unknown, say so clearly and flag it as TBD.\n"
             "- The improved PRD must be strictly better — not just longer."
+        )
+        output_intro = "A complete, improved PRD in Markdown with all 10 standard sections:\n"
+
+    market_section = (
+        "4. Market Opportunity (with validated competitive data)\n"
+        if plan["run_validation"] else
+        "4. Market Opportunity\n"
+    )
+
+    # Task 2: writer produces the improved PRD
+    rewrite_task = Task(
+        description=(
+            f"{preamble}"
+            f"You have {'three' if plan['run_validation'] else 'two'} inputs:\n\n"
+            "=== INPUT 1: ORIGINAL PRD ===\n"
+            f"{prd_text}\n"
+            "=== END ORIGINAL PRD ===\n\n"
+            "=== INPUT 2: CRITIQUE REPORT ===\n"
+            f"{critique_text}\n"
+            "=== END CRITIQUE ===\n\n"
+            f"{market_input}"
+            f"{instructions}"
         ),
         expected_output=(
-            "A complete, improved PRD in Markdown with all 10 standard sections:\n"
+            f"{output_intro}"
             "1. Executive Summary\n"
             "2. Problem Statement\n"
             "3. User Personas\n"
-            "4. Market Opportunity (with validated competitive data)\n"
+            f"{market_section}"
             "5. Product Vision & Goals\n"
             "6. Feature Requirements (P0/P1/P2 prioritized)\n"
             "7. Technical Architecture\n"
@@ -162,15 +359,21 @@ def rewrite_prd(prd_text: str, critique_text: str) -> str:
             "Each section must be specific and actionable — no placeholder language except explicit TBDs."
         ),
         agent=writer,
-        context=[validate_task]
+        context=[validate_task] if plan["run_validation"] else []
     )
 
+    if plan["run_validation"]:
+        agents, tasks = [researcher, writer], [validate_task, rewrite_task]
+    else:
+        agents, tasks = [writer], [rewrite_task]
+
     crew = Crew(
-        agents=[researcher, writer],
-        tasks=[validate_task, rewrite_task],
+        agents=agents,
+        tasks=tasks,
         process=Process.sequential,
         verbose=True
     )
 
     result = crew.kickoff()
-    return str(result)
\ No newline at end of file
+    market_validation = str(validate_task.output) if plan["run_validation"] and validate_task.output else None
+    return str(result), market_validation
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Smoke tests for exporter.py — run with `python -m pytest` from the project root.
+"""
+
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+docx = pytest.importorskip("docx")
+pytest.importorskip("markdown_it")
+
+import exporter  # noqa: E402
+
+CRITIQUE = """## PRD Critique Report
+### 1. Section Coverage Scorecard
+| Section | Status | Notes |
+|---|---|---|
+| Executive Summary | ✅ Present | Clear pitch |
+| Risk Register | ⚠️ Weak | Only 2 risks |
+| Financial Model | ❌ Missing | No pricing |
+
+### 5. Overall Quality Score
+**6/10** — solid start, see https://example.com/benchmarks.
+
+- **Bold** item
+  - nested item
+1. numbered item
+
+<script>alert("x")</script>
+"""
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_CACHE_DIR", str(tmp_path / "cache"))
+    exporter._memory_cache.clear()
+    exporter.retry_failed()
+
+
+def _wait(future, timeout=30):
+    deadline = time.time() + timeout
+    while not future.done() and time.time() < deadline:
+        time.sleep(0.05)
+    return future
+
+
+@pytest.mark.parametrize("fmt", list(exporter.FORMATS))
+def test_every_format_renders_scorecard(fmt):
+    data = exporter.render_artifact(CRITIQUE, fmt, "Critique")
+    assert data
+
+
+def test_pdf_keeps_status_glyphs():
+    pdf = fitz.open(stream=exporter.render_pdf(CRITIQUE), filetype="pdf")
+    text = "".join(page.get_text() for page in pdf)
+    for glyph in ("✅", "⚠", "❌"):
+        assert glyph in text
+    assert "\x00" not in text
+
+
+def test_docx_scorecard_table():
+    document = docx.Document(io.BytesIO(exporter.render_docx(CRITIQUE)))
+    cells = [cell.text for row in document.tables[0].rows for cell in row.cells]
+    assert "✅ Present" in cells
+    assert "❌ Missing" in cells
+
+
+def test_raw_html_is_escaped():
+    page = exporter.render_html(CRITIQUE, "<Critique>")
+    assert "<script>" not in page
+    assert "&lt;script&gt;" in page
+    assert "<title>&lt;Critique&gt;</title>" in page
+
+
+def test_failed_render_is_not_resubmitted(monkeypatch):
+    calls = []
+
+    def broken(markdown_text, fmt, title):
+        calls.append(fmt)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(exporter, "_render", broken)
+    first = _wait(exporter.submit_export("broken doc", "pdf"))
+    assert isinstance(first.exception(), RuntimeError)
+    assert exporter.submit_export("broken doc", "pdf") is first
+    assert calls == ["pdf"]
+
+
+def test_memory_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_MEMORY_ITEMS", 3)
+    for i in range(10):
+        exporter.render_artifact(f"doc {i}", "md")
+    assert len(exporter._memory_cache) == 3
+
+
+def test_bundle_contains_documents_and_evidence():
+    data = exporter.build_bundle(
+        "Demo", "# PRD\n\nBody", CRITIQUE,
+        sources={"market_validation": "# Market Validation Note\n\nSee https://example.org/report"},
+    )
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    names = set(archive.namelist())
+    assert {"PRD_Demo.pdf", "Critique_Demo.docx", "evidence/market_validation.md"} <= names
+    sources = archive.read("evidence/sources.md").decode("utf-8")
+    assert "https://example.com/benchmarks" in sources
+    assert "https://example.org/report" in sources
+
+
+def test_non_html_formats_share_artifacts_across_titles(monkeypatch):
+    calls = []
+    real_render = exporter._render
+
+    def counting(markdown_text, fmt, title):
+        calls.append((fmt, title))
+        return real_render(markdown_text, fmt, title)
+
+    monkeypatch.setattr(exporter, "_render", counting)
+    for title in ("Improved_PRD_Demo", "PRD_Demo"):
+        for fmt in exporter.FORMATS:
+            exporter.render_artifact("# Same PRD", fmt, title)
+    assert sorted(fmt for fmt, _ in calls) == ["docx", "html", "html", "md", "pdf"]
+
+
+def test_file_pruned_by_another_worker_is_rebuilt():
+    exporter.render_artifact("# Doc", "md")
+    exporter._memory_cache.clear()
+    for entry in os.scandir(exporter.EXPORT_CACHE_DIR):
+        os.remove(entry.path)
+    assert exporter.render_artifact("# Doc", "md") == b"# Doc"
+
+
+def test_submit_bundle_computes_contents_once(monkeypatch):
+    calls = []
+    real_contents = exporter._bundle_contents
+
+    def counting(*args):
+        calls.append(args)
+        return real_contents(*args)
+
+    monkeypatch.setattr(exporter, "_bundle_contents", counting)
+    future = _wait(exporter.submit_bundle("Demo", "# PRD", "# Critique"))
+    assert zipfile.ZipFile(io.BytesIO(future.result())).namelist()
+    assert len(calls) == 1
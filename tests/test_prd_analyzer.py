@@ -0,0 +1,168 @@
+"""
+Tests for prd_analyzer.py — run with `python -m pytest` from the project root.
+
+The agent crews are replaced with fakes, so no LLM or web-search calls are made.
+"""
+
+import importlib.util
+import sys
+import types
+
+import pytest
+
+
+def _stub_missing(name, **attrs):
+    if name in sys.modules or importlib.util.find_spec(name) is not None:
+        return
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+
+
+_stub_missing("pdfplumber")
+_stub_missing("crewai", Crew=object, Process=types.SimpleNamespace(sequential="sequential"), Task=object)
+# agents.py builds real LLM clients at import time; the analyzer only needs the names
+sys.modules.setdefault(
+    "agents", types.SimpleNamespace(critic="critic", writer="writer", researcher="researcher")
+)
+
+import prd_analyzer  # noqa: E402
+
+
+class FakeTask:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+        self.output = None
+
+
+class FakeCrew:
+    runs = []
+
+    def __init__(self, agents, tasks, **kwargs):
+        self.agents, self.tasks = agents, tasks
+
+    def kickoff(self):
+        FakeCrew.runs.append(self)
+        for task in self.tasks:
+            task.output = f"output from {task.agent}"
+        return self.tasks[-1].output
+
+
+@pytest.fixture(autouse=True)
+def fake_crew(monkeypatch):
+    FakeCrew.runs = []
+    monkeypatch.setattr(prd_analyzer, "Crew", FakeCrew)
+    monkeypatch.setattr(prd_analyzer, "Task", FakeTask)
+
+
+def make_critique(blind_spots="Accessibility needs are not covered.",
+                  score="**8.5/10** — a strong, well-structured PRD.",
+                  risk_status="⚠️ Weak",
+                  improvements="1. Tighten the success metric."):
+    return f"""## PRD Critique Report
+### 1. Section Coverage Scorecard
+| Section | Status | Notes |
+|---|---|---|
+| Executive Summary | ✅ Present | rated 9/10 clarity |
+| Market Opportunity | ✅ Present | fine |
+| Risk Register | {risk_status} | thin |
+### 2. Top 3 Weakest Assumptions
+1. Adoption is optimistic — persona Sam onboards in a day.
+### 3. Blind Spots
+{blind_spots}
+### 4. Contradictions & Internal Tensions
+Timeline conflicts with scope.
+### 5. Overall Quality Score
+{score}
+### 6. Top 5 Recommended Improvements
+{improvements}
+"""
+
+
+# PLANNING
+
+def test_high_score_without_market_terms_is_targeted_and_skips_validation():
+    plan = prd_analyzer.plan_rewrite(make_critique())
+    assert plan["quality_score"] == 8.5
+    assert plan["flagged_sections"] == {"Risk Register": "weak"}
+    assert plan["run_validation"] is False
+    assert plan["rewrite_mode"] == "targeted"
+    assert plan["estimated_seconds_saved"] > 0
+
+
+def test_persona_named_sam_is_not_a_market_issue():
+    plan = prd_analyzer.plan_rewrite(make_critique(blind_spots="Sam's team workflow is ignored."))
+    assert plan["run_validation"] is False
+
+
+@pytest.mark.parametrize("blind_spots", [
+    "Ignores established competitors such as Notion and Asana.",
+    "Market sizing relies on a 2019 report.",
+    "The TAMs quoted are inflated.",
+])
+def test_market_terms_trigger_validation(blind_spots):
+    assert prd_analyzer.plan_rewrite(make_critique(blind_spots=blind_spots))["run_validation"] is True
+
+
+def test_market_terms_in_recommended_improvements_trigger_validation():
+    plan = prd_analyzer.plan_rewrite(make_critique(improvements="1. Add competitor analysis."))
+    assert plan["run_validation"] is True
+
+
+def test_score_outside_section_five_is_ignored():
+    plan = prd_analyzer.plan_rewrite(make_critique(score="The author should be proud."))
+    assert plan["quality_score"] is None
+    assert plan["rewrite_mode"] == "full"
+
+
+def test_missing_section_forces_full_rewrite():
+    plan = prd_analyzer.plan_rewrite(make_critique(risk_status="❌ Missing"))
+    assert plan["flagged_sections"] == {"Risk Register": "missing"}
+    assert plan["rewrite_mode"] == "full"
+
+
+def test_unrecognised_layout_keeps_validation_and_full_rewrite():
+    critique = "Great PRD, 9/10. Improvements: Risk Register ⚠️ could use more depth."
+    plan = prd_analyzer.plan_rewrite(critique)
+    assert plan["quality_score"] is None
+    assert plan["flagged_sections"] == {}
+    assert plan["run_validation"] is True
+    assert plan["rewrite_mode"] == "full"
+    assert plan["skipped_stages"] == []
+
+
+def test_missing_scorecard_prevents_targeted_rewrite():
+    critique = make_critique().split("### 2.")[1]
+    plan = prd_analyzer.plan_rewrite("### 2." + critique)
+    assert plan["quality_score"] == 8.5
+    assert plan["flagged_sections"] == {}
+    assert plan["rewrite_mode"] == "full"
+
+
+# CREWS
+
+def test_critique_prd_returns_report_text():
+    assert prd_analyzer.critique_prd("# My PRD") == "output from critic"
+    assert FakeCrew.runs[0].agents == ["critic"]
+
+
+def test_rewrite_prd_with_validation_returns_market_note():
+    critique = make_critique(blind_spots="Competitors are missing.")
+    improved, market_validation = prd_analyzer.rewrite_prd("# My PRD", critique)
+    assert improved == "output from writer"
+    assert market_validation == "output from researcher"
+    assert FakeCrew.runs[0].agents == ["researcher", "writer"]
+
+
+def test_rewrite_prd_skipping_validation_runs_writer_only():
+    critique = make_critique()
+    improved, market_validation = prd_analyzer.rewrite_prd("# My PRD", critique)
+    assert improved == "output from writer"
+    assert market_validation is None
+
+    crew = FakeCrew.runs[0]
+    assert crew.agents == ["writer"]
+    rewrite_task = crew.tasks[0]
+    assert rewrite_task.context == []
+    assert "validated competitive data" not in rewrite_task.expected_output
+    assert "may touch sections that are not flagged" in rewrite_task.description